@@ -1,3 +1,4 @@
+import functools
 import os
 import pickle
 import time
@@ -13,6 +14,10 @@ from RenRestore.ArchiveFormats.Utility import NoPrePostprocess
 
 _logger = logging.get_logger()
 
+READ_CHUNK_SIZE = 1024 * 1024
+"""The size of the segments files are read in, bounding memory use and progress granularity per read."""
+
+
 class DefaultArchiveIndex(ArchiveFormat, metaclass=ABCMeta):
     def index(self, archive: BinaryIO, offset_and_key: Optional[Tuple[int, int]]) -> Dict[str, Iterable[Tuple[int, int, bytes]]]:
         offset: int
@@ -50,7 +55,7 @@ class DefaultArchiveExtraction(ArchiveFormat, metaclass=ABCMeta):
             try:
                 _logger.info(f"[{file_number / len(index):.1%}] Extracted: {path}")
                 file_walk = ArchiveWalker(archive, *next(iter(data)))
-                yield path, iter(file_walk.read, b"")
+                yield path, iter(functools.partial(file_walk.read, READ_CHUNK_SIZE), b"")
 
             except Exception as error:
                 on_exception(error)
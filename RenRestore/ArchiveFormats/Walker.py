@@ -2,25 +2,40 @@ import io
 from typing import BinaryIO
 
 
+class _PositionalStream:
+    def __init__(self, archive: BinaryIO, offset: int):
+        self.archive = archive
+        self.position = offset
+
+    def read(self, read_length: int) -> bytes:
+        segment = self.archive.read_at(self.position, read_length)
+        self.position += len(segment)
+        return segment
+
+
 class ArchiveWalker:
     def __init__(self, archive: BinaryIO, offset: int, length: int, prefix: bytes):
         self.archive = archive
         self.remaining = length
-        self.archive.seek(offset)
-        self.data_streams = [io.BytesIO(prefix), self.archive] if prefix else [self.archive]
+        # Archives backed by a storage backend are read by position, so walkers do not share a file cursor
+        source = _PositionalStream(archive, offset) if hasattr(archive, "read_at") else archive
+        if source is archive:
+            self.archive.seek(offset)
+        self.data_streams = [io.BytesIO(prefix), source] if prefix else [source]
 
     def read(self, read_length: int = -1) -> bytes:
         read_length = self._adjust_read_length(read_length)
-        result = bytearray()
+        # Joining the segments at the end avoids copying a read that is served by a single stream
+        result = []
         while self._can_read(read_length):
             segment = self._read_segment(read_length)
             if segment:
-                result.extend(segment)
+                result.append(segment)
                 read_length -= len(segment)
             else:
                 self.data_streams.pop(0)
         self._check_remaining(read_length)
-        return bytes(result)
+        return b"".join(result)
 
     def _adjust_read_length(self, read_length: int) -> int:
         if read_length < 0 or read_length > self.remaining:
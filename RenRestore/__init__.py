@@ -1,6 +1,8 @@
+import contextlib
 import io
 import os
 import pathlib
+import shutil
 import traceback
 from collections.abc import Callable
 from pathlib import Path
@@ -8,20 +10,46 @@ from typing import (
     Tuple,
     Optional,
     Type,
-    FrozenSet, Set, BinaryIO )
+    FrozenSet, Set, BinaryIO, ContextManager, Dict, Iterable, Iterator )
 
 from RenRestore.ArchiveFormats.Format import ArchiveFormat
 from RenRestore.ArchiveFormats.Registry import ArchiveFormatRegistry, AutoRegistry
 from RenRestore.errors import (
     ErrorExtractingFile,
     AmbiguousArchiveFormatError,
-    UnknownArchiveFormatError, FormatError,
+    UnknownArchiveFormatError, FormatError, RenRestoreError,
 )
 from RenRestore.logging import get_logger
+from RenRestore.storage import default_archive_opener, is_remote
 
 _logger = logging.get_logger()
 
 
+def _try_catch_method[X, Y](source: X, method: Callable[[X], Y],
+                            on_exception: Callable[[Exception], ...] | Exception) -> Y:
+    """
+    Tries to call a method with an object as a parameter and catches any exception that occurs.
+
+    :param source: The object to pass to the method.
+    :param method: The method to call.
+    :param on_exception: The method to call if an exception occurs. If this is an exception, it will be raised.
+
+    :return: The result of the method.
+    """
+    try:
+        return method(source)
+    except Exception as err:
+        _logger.debug(f"Exception bordered in {method.__name__}: {err}")
+        _logger.debug(traceback.format_exc())
+        if isinstance(on_exception, Exception):
+            raise on_exception from err
+        on_exception(err)
+
+
+def _phase(phase_hook: Optional[Callable[[str], ContextManager]], name: str) -> ContextManager:
+    return phase_hook(name) if phase_hook else contextlib.nullcontext()
+
+
 class RenRestore:
     """A class for extracting RPA archives."""
 
@@ -35,6 +63,9 @@ class RenRestore:
     format_registry: ArchiveFormatRegistry
     """The registry that will be used to detect the archive format."""
 
+    archive_opener: Callable[[str], BinaryIO]
+    """Opens an archive path or URL for reading, see RenRestore.storage for cached and remote backends."""
+
     @property
     def formats(self) -> FrozenSet[Type[ArchiveFormat]]:
         """
@@ -47,7 +78,8 @@ class RenRestore:
                  create_output_directory: bool = False,
                  continue_on_error: bool = False,
                  format_registry: ArchiveFormatRegistry = None,
-                 extra_formats: Optional[FrozenSet[Type[ArchiveFormat]]] = None) -> None:
+                 extra_formats: Optional[FrozenSet[Type[ArchiveFormat]]] = None,
+                 archive_opener: Optional[Callable[[str], BinaryIO]] = None) -> None:
 
         self.format_registry = format_registry
         if not format_registry:
@@ -61,18 +93,27 @@ class RenRestore:
 
         self.continue_on_error = continue_on_error
 
+        self.archive_opener = archive_opener if archive_opener else default_archive_opener
+
     def extract_files(self,
                       file_path: str,
                       output_override: Optional[str] = None,
                       format_override: Optional[Type[ArchiveFormat]] = None,
-                      offset_and_key_override: Optional[Tuple[int, int]] = None) -> None:
+                      offset_and_key_override: Optional[Tuple[int, int]] = None,
+                      file_filter: Optional[Callable[[str], bool]] = None,
+                      on_progress: Optional[Callable[[str, int], None]] = None,
+                      phase_hook: Optional[Callable[[str], ContextManager]] = None) -> int:
         """
         Extracts files from an archive.
 
-        :param file_path: The path to the archive.
+        :param file_path: The path or http(s) URL of the archive.
         :param output_override: The path to the output directory.
         :param format_override: The format to use to extract the archive.
         :param offset_and_key_override: The offset and key to use to extract the archive.
+        :param file_filter: Called with every path in the index, only files it returns True for are extracted.
+        :param on_progress: Called with the path and the number of bytes of every segment read from the archive.
+        :param phase_hook: Called with the name of every extraction phase, the returned context manager is entered
+        for the duration of the phase. The phases are "detect", "preprocess", "index" and "extract".
 
         :raises ErrorExtractingFile: If an error occurs while extracting a file.
 
@@ -89,129 +130,322 @@ class RenRestore:
         :raises NotADirectoryError: If the output path is not a directory.
 
         :raises OSError: If an error occurs while opening the archive.
+
+        :return: The number of files that failed, failures are only counted if continue_on_error is set,
+        otherwise the first one is raised.
         """
 
         output_path = os.path.abspath(output_override) if output_override else self.output_path
-        file_path = os.path.abspath(file_path)
+        file_path = file_path if is_remote(file_path) else os.path.abspath(file_path)
+        failed = 0
 
         _logger.info(f"Extracting files from {file_path}.")
 
         if self.create_output_directory and not os.path.exists(output_path):
             _logger.debug(f"Creating output directory: {output_path}")
-            os.makedirs(output_path)
+            # Other archives may be extracted into the same directory at the same time
+            os.makedirs(output_path, exist_ok=True)
 
         if not os.path.isdir(output_path):
             raise NotADirectoryError(f"The output path {output_path} is not a directory.")
 
         _logger.debug(f"Output directory: {output_path}")
-        archive_format = format_override() if format_override else (
-            self.detect_archive_format(file_path, False, self.format_registry.formats | self.extra_formats))
 
-        if archive_format is None:
-            raise UnknownArchiveFormatError(set())
+        def on_exception_in_extract(raised_error: Exception) -> None:
+            nonlocal failed
+            failed += 1
+            self._on_exception_in_extract(raised_error)
 
-        def try_catch_method[X, Y](source: X, method: Callable[[X], Y],
-                                   on_exception: Callable[[Exception], ...] | Exception) -> Y:
-            """
-            Tries to call a method with an object as a parameter and catches any exception that occurs.
+        class InMemoryWrite(io.BytesIO):
 
-            :param source: The object to pass to the method.
-            :param method: The method to call.
-            :param on_exception: The method to call if an exception occurs. If this is an exception, it will be raised.
+            def __init__(self, path: pathlib.Path):
+                super().__init__()
+                self._path: Path = path
+
+            @property
+            def name(self) -> pathlib.Path:
+                return self._path
 
-            :return: The result of the method.
-            """
+        with self._open_archive(file_path, format_override, phase_hook) as (archive_format, archive):
             try:
-                return method(source)
-            except Exception as err:
-                _logger.debug(f"Exception bordered in {method.__name__}: {err}")
-                _logger.debug(traceback.format_exc())
-                if isinstance(on_exception, Exception):
-                    raise on_exception from err
-                on_exception(err)
+                index = self._index_archive(archive_format, archive, file_path, offset_and_key_override,
+                                            file_filter, phase_hook)
+
+                with _phase(phase_hook, "extract"):
+                    _logger.debug(f"Extracting {file_path}")
+                    extract = archive_format.extract(index, archive, on_exception_in_extract)
+                    _logger.debug(f"Writing files to {output_path}")
+                    for target_file, segments in extract:
+
+                        target_file_path = os.path.join(output_path, target_file)
+
+                        # Maybe DEPRECATED: The extractor supplies a target file path where it would write the file to.
+                        # This behavior is not guaranteed and can be changed by the postprocess method.
+                        # For example, the postprocess method can return an io.BytesIO object to write to memory.
+                        # Which internally can be used to in-memory decompile the extracted file and write it to disk.
+                        # The postprocess method can also close the file, in which case the file will not be written.
+
+                        # The postprocessing method allows to intercept the output file and to close it,
+                        # at writing time or at any other time. This is useful for in-memory compilation and filtering,
+                        # and especially stacking postprocessing methods. (currently not implemented in this code)
+                        try:
+                            with InMemoryWrite(pathlib.Path(target_file_path)) as mem_file:
+                                output_file = _try_catch_method(mem_file,
+                                                 archive_format.postprocess, FormatError)
+
+                                if output_file.closed:
+                                    continue
+
+                                if output_file is mem_file:
+                                    # Nothing intercepts the writes, so the segments are streamed to disk
+                                    # instead of being collected in memory first.
+                                    self._write_segments(target_file_path, target_file, segments, on_progress)
+                                    continue
+
+                                skipped = False
+                                for segment in segments:
+                                    if output_file.closed:
+                                        skipped = True
+                                        break
+                                    output_file.write(segment)
+                                    if on_progress:
+                                        on_progress(target_file, len(segment))
+
+                                if skipped or output_file.closed:
+                                    continue
+
+                                # At this point, the output file is not closed and the segments were written to it.
+                                # Now we can write the file to disk.
+
+                                os.makedirs(os.path.dirname(target_file_path), exist_ok=True)
+
+                                output_file.seek(0)
+                                with open(target_file_path, "wb") as file:
+                                    shutil.copyfileobj(output_file, file)
+                        except Exception as error:
+                            on_exception_in_extract(error)
+
+            except ErrorExtractingFile:
+                # Already handled where it was raised
+                raise
+            except Exception as error:
+                on_exception_in_extract(error)
 
-        def on_exception_in_extract(raised_error: Exception) -> None:
-            """
-            Handles an exception that occurs while extracting a file.
+        return failed
 
-            :param raised_error: The exception that occurred.
+    @staticmethod
+    def _write_segments(target_file_path: str,
+                        target_file: str,
+                        segments: Iterable[bytes],
+                        on_progress: Optional[Callable[[str, int], None]]) -> None:
+        """
+        Writes the segments of a file straight to disk.
 
-            :raises ErrorExtractingFile: If the error is not a FormatError and continue_on_error is False.
+        The segments are written to a temporary file next to the target, which replaces the target once
+        all segments were read, so a failed read does not leave a truncated file behind.
 
-            :return: None
-            """
-            if not self.continue_on_error:
-                if isinstance(raised_error, FormatError):
-                    raise raised_error
-                raise ErrorExtractingFile(traceback.format_exc()) from raised_error
+        :param target_file_path: The path to write the file to.
+        :param target_file: The path of the file in the archive, passed to on_progress.
+        :param segments: The segments of the file.
+        :param on_progress: See extract_files.
+        """
+        os.makedirs(os.path.dirname(target_file_path), exist_ok=True)
+
+        partial_file_path = f"{target_file_path}.part"
+        try:
+            with open(partial_file_path, "wb") as file:
+                for segment in segments:
+                    file.write(segment)
+                    if on_progress:
+                        on_progress(target_file, len(segment))
+            os.replace(partial_file_path, target_file_path)
+        except BaseException:
+            if os.path.exists(partial_file_path):
+                os.remove(partial_file_path)
+            raise
+
+    def list_files(self,
+                   file_path: str,
+                   format_override: Optional[Type[ArchiveFormat]] = None,
+                   offset_and_key_override: Optional[Tuple[int, int]] = None,
+                   file_filter: Optional[Callable[[str], bool]] = None,
+                   phase_hook: Optional[Callable[[str], ContextManager]] = None) -> Dict[str, int]:
+        """
+        Lists the files in an archive without extracting them.
 
-            _logger.error(f"Extractions exception: {raised_error} continuing per instruction.")
+        :param file_path: The path or http(s) URL of the archive.
+        :param format_override: The format to use to read the archive.
+        :param offset_and_key_override: The offset and key to use to read the archive.
+        :param file_filter: Called with every path in the index, only files it returns True for are listed.
+        :param phase_hook: See extract_files, the phases are "detect", "preprocess" and "index".
 
-        class InMemoryWrite(io.BytesIO):
+        :raises UnknownArchiveFormatError: If the archive format is unknown.
+        :raises AmbiguousArchiveFormatError: If more than one archive format was detected.
+        :raises FormatError: If the format plugin fails to preprocess the archive or its index can not be read.
+        :raises OSError: If an error occurs while opening the archive.
 
-            def __init__(self, path: pathlib.Path):
-                super().__init__()
-                self._path: Path = path
+        :return: The size in bytes of every file in the archive, by path.
+        """
 
-            @property
-            def name(self) -> pathlib.Path:
-                return self._path
+        file_path = file_path if is_remote(file_path) else os.path.abspath(file_path)
 
-        with (try_catch_method(open(file_path, "rb"), archive_format.preprocess, FormatError) as archive):
+        with self._open_archive(file_path, format_override, phase_hook) as (archive_format, archive):
             try:
-                offset_and_key = offset_and_key_override
-                if not offset_and_key_override:
-                    _logger.debug(f"Finding padding and key for {file_path}")
-                    offset_and_key = archive_format.find_offset_and_key(archive)
-                _logger.debug(f"Using offset and key found: {offset_and_key}")
-
-                _logger.debug(f"Indexing {file_path}")
-                index = archive_format.index(archive, offset_and_key)
-                _logger.debug(f"Extracting {file_path}")
-                extract = archive_format.extract(index, archive, on_exception_in_extract)
-                _logger.debug(f"Writing files to {output_path}")
-                for target_file, segments in extract:
-
-                    target_file_path = os.path.join(output_path, target_file)
-
-                    # Maybe DEPRECATED: The extractor supplies a target file path where it would write the file to.
-                    # This behavior is not guaranteed and can be changed by the postprocess method.
-                    # For example, the postprocess method can return an io.BytesIO object to write to memory.
-                    # Which internally can be used to in-memory decompile the extracted file and write it to disk.
-                    # The postprocess method can also close the file, in which case the file will not be written.
-
-                    # The postprocessing method allows to intercept the output file and to close it,
-                    # at writing time or at any other time. This is useful for in-memory compilation and filtering,
-                    # and especially stacking postprocessing methods. (currently not implemented in this code)
-                    with InMemoryWrite(pathlib.Path(target_file_path)) as mem_file:
-                        output_file = try_catch_method(mem_file,
-                                         archive_format.postprocess, FormatError)
-
-                        if output_file.closed:
-                            continue
+                index = self._index_archive(archive_format, archive, file_path, offset_and_key_override,
+                                            file_filter, phase_hook)
+            except RenRestoreError:
+                raise
+            except Exception as error:
+                raise FormatError(error) from error
 
-                        skipped = False
-                        for segment in segments:
-                            if output_file.closed:
-                                skipped = True
-                                break
-                            output_file.write(segment)
+        return {path: next(iter(data))[1] for path, data in index.items()}
 
-                        if skipped or output_file.closed:
-                            continue
+    def verify_files(self,
+                     file_path: str,
+                     format_override: Optional[Type[ArchiveFormat]] = None,
+                     offset_and_key_override: Optional[Tuple[int, int]] = None,
+                     file_filter: Optional[Callable[[str], bool]] = None,
+                     on_progress: Optional[Callable[[str, int], None]] = None,
+                     phase_hook: Optional[Callable[[str], ContextManager]] = None) -> Tuple[int, int]:
+        """
+        Reads every file in an archive without writing it, to check that the archive can be extracted.
+
+        :param file_path: The path or http(s) URL of the archive.
+        :param format_override: The format to use to read the archive.
+        :param offset_and_key_override: The offset and key to use to read the archive.
+        :param file_filter: Called with every path in the index, only files it returns True for are read.
+        :param on_progress: See extract_files.
+        :param phase_hook: See extract_files, the phases are "detect", "preprocess", "index" and "verify".
+
+        :raises ErrorExtractingFile: If an error occurs while reading a file.
+        :raises UnknownArchiveFormatError: If the archive format is unknown.
+        :raises AmbiguousArchiveFormatError: If more than one archive format was detected.
+        :raises FormatError: If the format plugin fails to process the archive.
+        :raises OSError: If an error occurs while opening the archive.
 
-                        # At this point, the output file is not closed and the segments were written to it.
-                        # Now we can write the file to disk.
+        :return: The number of files that were read completely and the number of files that failed,
+        failures are only counted if continue_on_error is set, otherwise the first one is raised.
+        """
 
-                        if not os.path.exists(os.path.dirname(target_file_path)):
-                            os.makedirs(os.path.dirname(target_file_path))
+        file_path = file_path if is_remote(file_path) else os.path.abspath(file_path)
+        verified = 0
+        failed = 0
 
-                        output_file.seek(0)
-                        with open(target_file_path, "wb") as file:
-                            file.write(output_file.read())
+        def on_exception_in_verify(raised_error: Exception) -> None:
+            nonlocal failed
+            failed += 1
+            self._on_exception_in_extract(raised_error)
 
+        _logger.info(f"Verifying files in {file_path}.")
+
+        with self._open_archive(file_path, format_override, phase_hook) as (archive_format, archive):
+            try:
+                index = self._index_archive(archive_format, archive, file_path, offset_and_key_override,
+                                            file_filter, phase_hook)
+
+                with _phase(phase_hook, "verify"):
+                    for target_file, segments in archive_format.extract(index, archive, on_exception_in_verify):
+                        try:
+                            for segment in segments:
+                                if on_progress:
+                                    on_progress(target_file, len(segment))
+                        except Exception as error:
+                            on_exception_in_verify(error)
+                            continue
+                        verified += 1
+
+            except ErrorExtractingFile:
+                # Already handled where it was raised
+                raise
             except Exception as error:
-                on_exception_in_extract(error)
+                on_exception_in_verify(error)
+
+        return verified, failed
+
+    @contextlib.contextmanager
+    def _open_archive(self,
+                      file_path: str,
+                      format_override: Optional[Type[ArchiveFormat]],
+                      phase_hook: Optional[Callable[[str], ContextManager]]) -> Iterator[Tuple[ArchiveFormat, BinaryIO]]:
+        """
+        Detects the format of an archive and opens it, preprocessed by that format.
+
+        :param file_path: The absolute path or URL of the archive.
+        :param format_override: The format to use instead of detecting it.
+        :param phase_hook: See extract_files.
+
+        :return: The archive format and the preprocessed archive, closed when the context is left.
+        """
+        # The archive is opened once for detection and extraction, so remote archives are not probed twice
+        source = self.archive_opener(file_path)
+        try:
+            with _phase(phase_hook, "detect"):
+                archive_format = format_override() if format_override else (
+                    self._detect_format(source, self.format_registry.formats | self.extra_formats))
+
+            if archive_format is None:
+                raise UnknownArchiveFormatError(set())
+
+            with _phase(phase_hook, "preprocess"):
+                archive = _try_catch_method(source, archive_format.preprocess, FormatError)
+        except BaseException:
+            source.close()
+            raise
+
+        with archive:
+            yield archive_format, archive
+
+    @staticmethod
+    def _index_archive(archive_format: ArchiveFormat,
+                       archive: BinaryIO,
+                       file_path: str,
+                       offset_and_key_override: Optional[Tuple[int, int]],
+                       file_filter: Optional[Callable[[str], bool]],
+                       phase_hook: Optional[Callable[[str], ContextManager]]) -> Dict[str, Iterable[Tuple[int, int, bytes]]]:
+        """
+        Reads the index of an opened archive.
+
+        :param archive_format: The format of the archive.
+        :param archive: The preprocessed archive.
+        :param file_path: The path or URL of the archive, used for logging.
+        :param offset_and_key_override: The offset and key to use instead of finding them.
+        :param file_filter: Called with every path in the index, only files it returns True for are kept.
+        :param phase_hook: See extract_files.
+
+        :return: The, optionally filtered, index of the archive.
+        """
+        with _phase(phase_hook, "index"):
+            offset_and_key = offset_and_key_override
+            if not offset_and_key_override:
+                _logger.debug(f"Finding padding and key for {file_path}")
+                offset_and_key = archive_format.find_offset_and_key(archive)
+            _logger.debug(f"Using offset and key found: {offset_and_key}")
+
+            _logger.debug(f"Indexing {file_path}")
+            index = archive_format.index(archive, offset_and_key)
+
+        if file_filter:
+            index = {path: data for path, data in index.items() if file_filter(path)}
+            _logger.debug(f"Filter kept {len(index)} files of {file_path}")
+
+        return index
+
+    def _on_exception_in_extract(self, raised_error: Exception) -> None:
+        """
+        Handles an exception that occurs while extracting a file.
+
+        :param raised_error: The exception that occurred.
+
+        :raises ErrorExtractingFile: If the error is not a FormatError and continue_on_error is False.
+
+        :return: None
+        """
+        if not self.continue_on_error:
+            if isinstance(raised_error, FormatError):
+                raise raised_error
+            raise ErrorExtractingFile(traceback.format_exc()) from raised_error
+
+        _logger.error(f"Extractions exception: {raised_error} continuing per instruction.")
 
     def detect_archive_format(self,
                               archive: str,
@@ -220,7 +454,7 @@ class RenRestore:
         """
         Detects the archive format of the archive.
 
-        :param archive: The path to the archive.
+        :param archive: The path or http(s) URL of the archive.
         :param use_registered_formats: Whether to use the registered formats.
         :param additional_formats: Additional formats to use to detect the archive format.
 
@@ -239,12 +473,24 @@ class RenRestore:
         if use_registered_formats:
             formats |= self.formats
 
+        with self.archive_opener(archive) as file:
+            return self._detect_format(file, formats)
+
+    @staticmethod
+    def _detect_format(file: BinaryIO, formats: FrozenSet[Type[ArchiveFormat]]) -> ArchiveFormat:
+        """
+        Detects the archive format of an opened archive, see detect_archive_format.
+
+        :param file: The opened archive, it is at the start again when this returns.
+        :param formats: The formats to try.
+
+        :return: The archive format that was detected.
+        """
         matches: Set[Type[ArchiveFormat]] = set()
-        with open(archive, "rb") as file:
-            for possible_format in formats:
-                if possible_format().detect(file):
-                    matches.add(possible_format)
-                file.seek(0)
+        for possible_format in formats:
+            if possible_format().detect(file):
+                matches.add(possible_format)
+            file.seek(0)
 
         if len(matches) == 0:
             raise UnknownArchiveFormatError(matches)
@@ -0,0 +1,5 @@
+import sys
+
+from RenRestore.cli import main
+
+sys.exit(main())
@@ -0,0 +1,310 @@
+import argparse
+import concurrent.futures
+import contextlib
+import cProfile
+import fnmatch
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+import urllib.parse
+from typing import Optional, List, Callable, Iterator, TextIO, Type, Sequence
+
+from RenRestore import RenRestore, ArchiveFormat
+from RenRestore.logging import get_logger
+from RenRestore.storage import is_remote
+
+_logger = get_logger()
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+class Progress:
+    """
+        A single line bytes/sec display on a terminal, shared by all workers.
+    """
+
+    width = 119
+
+    def __init__(self, stream: TextIO, interval: float = 0.1):
+        self.stream = stream
+        self.interval = interval
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._last_render = 0.0
+        self._path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def update(self, path: str, length: int) -> None:
+        with self._lock:
+            self.bytes += length
+            self._path = path
+            now = time.monotonic()
+            if now - self._last_render >= self.interval:
+                self._last_render = now
+                self._render(path)
+
+    def log(self, message: str) -> None:
+        """Writes a message above the progress line, the line is cleared first and drawn again below it."""
+        with self._lock:
+            self.stream.write(f"\r{"":<{self.width}}\r{message}\n")
+            if self._path is not None:
+                self._render(self._path)
+            self.stream.flush()
+
+    def finish(self) -> None:
+        with self._lock:
+            self._render("done")
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def _render(self, path: str) -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        line = (f"{_format_size(self.bytes)} in {elapsed:.1f}s "
+                f"({_format_size(self.bytes / elapsed)}/s) {path}")
+        self.stream.write(f"\r{line[:self.width]:<{self.width}}")
+        self.stream.flush()
+
+
+class _ProgressLogHandler(logging.Handler):
+    """
+        Emits log records through the progress display, so they do not end up inside the progress line.
+    """
+
+    def __init__(self, progress: Progress):
+        super().__init__()
+        self.progress = progress
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.progress.log(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class PhaseProfiler:
+    """
+        Profiles every phase of an archive with cProfile and tracemalloc and dumps one report per phase.
+
+        For each phase <label>.<phase>.prof holds the raw cProfile stats, readable with pstats or snakeviz,
+        and <label>.<phase>.txt the top functions by cumulative time, the peak traced memory and the top allocations.
+    """
+
+    def __init__(self, directory: str, label: str, top: int = 25):
+        self.directory = directory
+        self.label = label
+        self.top = top
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            self._dump(name, profile, elapsed, peak, after.compare_to(before, "lineno"))
+
+    def _dump(self, name: str, profile: cProfile.Profile, elapsed: float, peak: int,
+              allocations: List[tracemalloc.StatisticDiff]) -> None:
+        base = os.path.join(self.directory, f"{self.label}.{name}")
+        profile.dump_stats(f"{base}.prof")
+
+        stats_text = io.StringIO()
+        pstats.Stats(profile, stream=stats_text).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        with open(f"{base}.txt", "w", encoding="utf-8") as report:
+            report.write(f"Phase {name} of {self.label}: {elapsed:.3f}s, peak traced memory {_format_size(peak)}\n\n")
+            report.write(f"Top {self.top} allocations by size difference:\n")
+            for statistic in allocations[:self.top]:
+                report.write(f"  {statistic}\n")
+            report.write("\n")
+            report.write(stats_text.getvalue())
+
+        _logger.info(f"Wrote {name} profile of {self.label} to {base}.prof and {base}.txt")
+
+
+def _profile_label(number: int, archive: str) -> str:
+    """Names the reports of an archive after its file name, without URL queries or characters unsafe in paths."""
+    path = urllib.parse.urlparse(archive).path if is_remote(archive) else archive
+    name = os.path.basename(path.rstrip("/\\")) or "archive"
+    return f"{number:03d}-{re.sub(r"[^A-Za-z0-9._-]", "_", name)}"
+
+
+def _build_filter(include: Optional[Sequence[str]], exclude: Optional[Sequence[str]]) -> Optional[Callable[[str], bool]]:
+    if not include and not exclude:
+        return None
+
+    def file_filter(path: str) -> bool:
+        path = path.replace(os.sep, "/")
+        if include and not any(fnmatch.fnmatchcase(path, pattern) for pattern in include):
+            return False
+        return not (exclude and any(fnmatch.fnmatchcase(path, pattern) for pattern in exclude))
+
+    return file_filter
+
+
+def _find_format(parser: argparse.ArgumentParser, restorer: RenRestore,
+                 name: Optional[str]) -> Optional[Type[ArchiveFormat]]:
+    if name is None:
+        return None
+    for archive_format in restorer.formats:
+        if archive_format.name.lower() == name.lower():
+            return archive_format
+    parser.error(f"unknown archive format {name}, known formats: "
+                 f"{", ".join(sorted(archive_format.name for archive_format in restorer.formats))}")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("archives", nargs="+", metavar="ARCHIVE", help="Paths or http(s) URLs of the archives.")
+    common.add_argument("-j", "--workers", type=int, default=1,
+                        help="Number of archives processed at the same time (default: 1).")
+    common.add_argument("-i", "--include", action="append", metavar="GLOB",
+                        help="Only process files matching the pattern, can be given multiple times.")
+    common.add_argument("-x", "--exclude", action="append", metavar="GLOB",
+                        help="Skip files matching the pattern, can be given multiple times.")
+    common.add_argument("-f", "--format", metavar="NAME", help="Use this archive format instead of detecting it.")
+    common.add_argument("-v", "--verbose", action="count", default=0, help="Log more, can be given twice.")
+    common.add_argument("--profile", metavar="DIRECTORY",
+                        help="Write cProfile and tracemalloc reports for every phase of every archive. "
+                             "Forces a single worker.")
+
+    parser = argparse.ArgumentParser(prog="python -m RenRestore", description="Extract files from RenPy RPA archives.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    extract = commands.add_parser("extract", parents=[common], help="Extract the files of the archives.")
+    extract.add_argument("-o", "--output", default=os.getcwd(), help="Output directory (default: current directory).")
+    extract.add_argument("-k", "--continue-on-error", action="store_true",
+                         help="Log errors in single files and continue with the next file.")
+    extract.add_argument("--no-progress", action="store_true", help="Do not show the progress display.")
+
+    commands.add_parser("list", parents=[common], help="List the files of the archives with their size.")
+
+    verify = commands.add_parser("verify", parents=[common],
+                                 help="Read every file of the archives without writing them.")
+    verify.add_argument("-k", "--continue-on-error", action="store_true",
+                        help="Count unreadable files and continue with the next file.")
+    verify.add_argument("--no-progress", action="store_true", help="Do not show the progress display.")
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Runs the command line interface.
+
+    :param argv: The arguments, without the program name. Defaults to sys.argv.
+
+    :return: The exit code, 0 if every archive was processed without errors.
+    """
+    parser = _build_parser()
+    arguments = parser.parse_args(argv)
+
+    workers = max(1, arguments.workers)
+    if arguments.profile:
+        os.makedirs(arguments.profile, exist_ok=True)
+
+    restorer = RenRestore(output_path=getattr(arguments, "output", None), create_output_directory=True,
+                          continue_on_error=getattr(arguments, "continue_on_error", False))
+    format_override = _find_format(parser, restorer, arguments.format)
+    file_filter = _build_filter(arguments.include, arguments.exclude)
+
+    progress = None
+    if arguments.command != "list" and not arguments.no_progress and sys.stderr.isatty():
+        progress = Progress(sys.stderr)
+
+    handler = None
+    if not _logger.handlers or all(isinstance(existing, logging.NullHandler) for existing in _logger.handlers):
+        handler = _ProgressLogHandler(progress) if progress else logging.StreamHandler(sys.stderr)
+        _logger.addHandler(handler)
+    _logger.setLevel((logging.WARNING, logging.INFO, logging.DEBUG)[min(arguments.verbose, 2)])
+
+    if arguments.profile and workers > 1:
+        _logger.warning("Profiling runs a single worker, cProfile and tracemalloc can not separate threads.")
+        workers = 1
+
+    def run(number: int, archive: str):
+        phase_hook = None
+        if arguments.profile:
+            phase_hook = PhaseProfiler(arguments.profile, _profile_label(number, archive)).phase
+
+        on_progress = progress.update if progress else None
+        if arguments.command == "extract":
+            return restorer.extract_files(archive, format_override=format_override, file_filter=file_filter,
+                                          on_progress=on_progress, phase_hook=phase_hook)
+        if arguments.command == "verify":
+            return restorer.verify_files(archive, format_override=format_override, file_filter=file_filter,
+                                         on_progress=on_progress, phase_hook=phase_hook)
+        return restorer.list_files(archive, format_override=format_override, file_filter=file_filter,
+                                   phase_hook=phase_hook)
+
+    failed = 0
+    report: List[str] = []
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(run, number, archive) for number, archive in enumerate(arguments.archives)]
+
+        for archive, future in zip(arguments.archives, futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                failed += 1
+                # ErrorExtractingFile carries a whole traceback as message, its cause is the readable error
+                cause = error.__cause__ or error
+                _logger.error(f"{archive}: {type(cause).__name__}: {cause}")
+                _logger.debug("".join(traceback.format_exception(error)))
+                continue
+
+            if arguments.command == "list":
+                if len(arguments.archives) > 1:
+                    report.append(f"{archive}:")
+                report.extend(f"{size:>12}  {path}" for path, size in sorted(result.items()))
+            elif arguments.command == "verify":
+                verified, unreadable = result
+                failed += unreadable
+                report.append(f"{archive}: {verified} files OK, {unreadable} failed")
+            elif result:
+                failed += result
+                report.append(f"{archive}: {result} files failed")
+
+    except KeyboardInterrupt:
+        # Queued archives are dropped in finally, archives that are already running finish before the interpreter exits
+        _logger.error("Interrupted, skipping the remaining archives.")
+        return 130
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if progress:
+            progress.finish()
+        if handler:
+            _logger.removeHandler(handler)
+
+    for line in report:
+        print(line)
+
+    return 1 if failed else 0
@@ -0,0 +1,393 @@
+import io
+import mmap
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple, BinaryIO
+
+from RenRestore.logging import get_logger
+
+_log = get_logger()
+
+
+class StorageBackend(metaclass=ABCMeta):
+    """
+        A source of archive bytes that is read by position instead of through a shared file cursor.
+    """
+
+    name: str
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def read_at(self, offset: int, length: int) -> bytes:
+        """
+        Reads up to length bytes starting at offset.
+
+        :param offset: The absolute position to start reading from.
+        :param length: The maximum number of bytes to read.
+
+        :return: The bytes read, shorter than length only at the end of the storage.
+        """
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class LocalFileStorage(StorageBackend):
+    """
+        Reads a local file with os.pread, falling back to seek and read under a lock where pread is not available.
+    """
+
+    def __init__(self, file_path: str):
+        self.name = file_path
+        self._file = open(file_path, "rb")
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        length = max(0, min(length, self._size - offset))
+        if length == 0:
+            return b""
+
+        if hasattr(os, "pread"):
+            return os.pread(self._file.fileno(), length, offset)
+
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class MemoryMappedStorage(StorageBackend):
+    """
+        Reads a local file through a read-only memory map.
+    """
+
+    def __init__(self, file_path: str):
+        self.name = file_path
+        with open(file_path, "rb") as file:
+            self._size = os.fstat(file.fileno()).st_size
+            # Empty files can not be mapped
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        if self._map is None:
+            return b""
+        return self._map[offset:offset + max(0, length)]
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+
+
+class HTTPRangeStorage(StorageBackend):
+    """
+        Reads a remote file using HTTP range requests, one request per read_at call.
+    """
+
+    url: str
+    timeout: float
+
+    def __init__(self, url: str, timeout: float = 30.0, headers: Optional[Dict[str, str]] = None):
+        self.name = url
+        self.url = url
+        self.timeout = timeout
+        self._headers = dict(headers) if headers else {}
+        self._size: Optional[int] = None
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = self._request_size()
+        return self._size
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        length = max(0, min(length, self.size - offset))
+        if length == 0:
+            return b""
+
+        end = offset + length - 1
+        _log.debug(f"Requesting bytes {offset}-{end} of {self.url}")
+        with self._open({"Range": f"bytes={offset}-{end}"}) as response:
+            if response.status != 206:
+                raise OSError(f"{self.url} does not support range requests (status {response.status}).")
+
+            # A proxy answering with another range than requested would otherwise corrupt the data silently
+            content_range = response.headers.get("Content-Range", "")
+            if not content_range.startswith(f"bytes {offset}-{end}/"):
+                raise OSError(f"{self.url} answered bytes {offset}-{end} with Content-Range {content_range!r}.")
+
+            data = response.read(length)
+            if len(data) != length:
+                raise OSError(f"{self.url} sent {len(data)} of {length} requested bytes.")
+            return data
+
+    def _request_size(self) -> int:
+        # A one byte range request returns the full size in Content-Range and works on servers that reject HEAD
+        try:
+            with self._open({"Range": "bytes=0-0"}) as response:
+                content_range = response.headers.get("Content-Range")
+                if response.status == 206 and content_range and "/" in content_range:
+                    total = content_range.rsplit("/", 1)[1].strip()
+                    if total != "*":
+                        return int(total)
+                raise OSError(f"{self.url} does not support range requests (status {response.status}).")
+        except urllib.error.HTTPError as error:
+            # Range not satisfiable is the answer for an empty resource
+            if error.code == 416:
+                return 0
+            raise
+
+    def _open(self, headers: Dict[str, str]):
+        request = urllib.request.Request(self.url, headers={**self._headers, **headers})
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+
+class CachedStorage(StorageBackend):
+    """
+        Wraps another backend with a size bounded LRU cache of fixed size blocks.
+
+        Missing blocks that are next to each other are fetched with a single read_at call on the wrapped backend,
+        extended by read_ahead blocks, so sequential and index reads cost few round trips.
+    """
+
+    block_size: int
+    max_blocks: int
+    read_ahead: int
+
+    def __init__(self, backend: StorageBackend, block_size: int = 64 * 1024, cache_size: int = 16 * 1024 * 1024,
+                 read_ahead: int = 4):
+        if block_size <= 0:
+            raise ValueError(f"The block size must be positive, got {block_size}.")
+
+        self.name = backend.name
+        self.backend = backend
+        self.block_size = block_size
+        self.max_blocks = max(1, cache_size // block_size)
+        self.read_ahead = max(0, read_ahead)
+
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        return self.backend.size
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        length = max(0, min(length, self.size - offset))
+        if length == 0:
+            return b""
+
+        first_block = offset // self.block_size
+        last_block = (offset + length - 1) // self.block_size
+
+        with self._lock:
+            blocks = self._get_blocks(first_block, last_block)
+
+        start = offset - first_block * self.block_size
+        return b"".join(blocks)[start:start + length]
+
+    def _get_blocks(self, first_block: int, last_block: int) -> Tuple[bytes, ...]:
+        found: Dict[int, bytes] = {}
+        block = first_block
+        while block <= last_block:
+            if block in self._blocks:
+                self._blocks.move_to_end(block)
+                found[block] = self._blocks[block]
+                self.hits += 1
+                block += 1
+                continue
+
+            # Fetch the whole run of missing blocks plus the read-ahead in one request,
+            # the read-ahead stops at the first block that is already cached
+            run_end = block
+            while run_end + 1 <= last_block and run_end + 1 not in self._blocks:
+                run_end += 1
+            fetch_end = run_end
+            end_of_storage = (self.size - 1) // self.block_size
+            while (fetch_end < min(run_end + self.read_ahead, end_of_storage)
+                   and fetch_end + 1 not in self._blocks):
+                fetch_end += 1
+
+            self.misses += run_end - block + 1
+            data = self.backend.read_at(block * self.block_size, (fetch_end - block + 1) * self.block_size)
+
+            for fetched in range(block, fetch_end + 1):
+                chunk = data[(fetched - block) * self.block_size:(fetched - block + 1) * self.block_size]
+                if not chunk:
+                    break
+                if fetched <= run_end:
+                    found[fetched] = chunk
+                self._store(fetched, chunk)
+
+            if run_end not in found:
+                raise EOFError(f"Unexpected end of storage {self.name}")
+            block = run_end + 1
+
+        return tuple(found[block] for block in range(first_block, last_block + 1))
+
+    def _store(self, block: int, chunk: bytes) -> None:
+        self._blocks[block] = chunk
+        self._blocks.move_to_end(block)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+    def close(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+        self.backend.close()
+
+
+class StorageReader(io.RawIOBase):
+    """
+        A seekable, read-only file object over a storage backend, usable wherever the formats expect a BinaryIO.
+
+        The reader keeps its own position and also exposes read_at, so several readers can share one backend.
+        Readers sharing a backend have to be created with owns_backend=False, the backend is then closed by its owner.
+    """
+
+    owns_backend: bool
+
+    def __init__(self, backend: StorageBackend, owns_backend: bool = True):
+        super().__init__()
+        self.backend = backend
+        self.owns_backend = owns_backend
+        self._position = 0
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.backend.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        return self.backend.read_at(offset, length)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = max(0, self.backend.size - self._position)
+        data = self.backend.read_at(self._position, size)
+        self._position += len(data)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read(-1)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readline(self, size: int = -1) -> bytes:
+        line = bytearray()
+        while size < 0 or len(line) < size:
+            chunk = self.backend.read_at(self._position, 256 if size < 0 else min(256, size - len(line)))
+            if not chunk:
+                break
+            newline = chunk.find(b"\n")
+            if newline != -1:
+                chunk = chunk[:newline + 1]
+            line.extend(chunk)
+            self._position += len(chunk)
+            if newline != -1:
+                break
+        return bytes(line)
+
+    def close(self) -> None:
+        if not self.closed and self.owns_backend:
+            self.backend.close()
+        super().close()
+
+
+def is_remote(location: str) -> bool:
+    return urllib.parse.urlparse(location).scheme in ("http", "https")
+
+
+def open_archive(location: str, block_size: int = 64 * 1024, cache_size: int = 16 * 1024 * 1024,
+                 read_ahead: int = 4, use_mmap: bool = False) -> StorageReader:
+    """
+    Opens an archive from a local path or an http(s) URL behind a block cache.
+    Memory mapped files are not cached, reads from the map are already served by the page cache.
+
+    :param location: The path or URL of the archive.
+    :param block_size: The size of the cached blocks.
+    :param cache_size: The maximum number of bytes the cache holds.
+    :param read_ahead: The number of blocks to fetch past a cache miss.
+    :param use_mmap: Whether to memory map local files instead of using positional reads.
+
+    :raises OSError: If an error occurs while opening the archive.
+
+    :return: A file object reading from the archive.
+    """
+    if is_remote(location):
+        backend = HTTPRangeStorage(location)
+    elif use_mmap:
+        return StorageReader(MemoryMappedStorage(location), owns_backend=True)
+    else:
+        backend = LocalFileStorage(location)
+
+    return StorageReader(CachedStorage(backend, block_size, cache_size, read_ahead), owns_backend=True)
+
+
+def default_archive_opener(location: str) -> BinaryIO:
+    """
+    Opens local archives as plain files and remote archives through a cached HTTP range backend.
+
+    :param location: The path or URL of the archive.
+
+    :raises OSError: If an error occurs while opening the archive.
+
+    :return: A file object reading from the archive.
+    """
+    if is_remote(location):
+        return open_archive(location)
+    return open(location, "rb")
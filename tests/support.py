@@ -0,0 +1,100 @@
+import http.server
+import os
+import pickle
+import re
+import threading
+import zlib
+from typing import Dict, Optional, List, Iterable
+
+
+def build_rpa3(path: str, files: Dict[str, bytes], key: int = 0x42, overrun: Iterable[str] = ()) -> None:
+    """Writes an RPA-3.0 archive holding the given files, the index entries of overrun point past its end."""
+    body = bytearray(b"RPA-3.0 " + b"0" * 16 + b" " + b"%08x" % key + b"\n")
+    index = {}
+    for name, data in files.items():
+        length = len(data) + (1 << 20 if name in overrun else 0)
+        index[name.encode()] = [(len(body) ^ key, length ^ key, b"")]
+        body += data
+
+    index_offset = len(body)
+    body += zlib.compress(pickle.dumps(index))
+    body[8:24] = b"%016x" % index_offset
+
+    with open(path, "wb") as archive:
+        archive.write(body)
+
+
+def sample_files(count: int = 20) -> Dict[str, bytes]:
+    return {os.path.join("images" if number % 2 else "scripts", f"file{number}.bin"): os.urandom(997 * number + 13)
+            for number in range(count)}
+
+
+class RangeServer:
+    """
+        A local stand-in for remote storage, serving files from a directory with HTTP range requests.
+
+        With honor_range=False it ignores Range headers and answers 200 with the whole file, like some servers do.
+        With max_range set it clamps ranges to that many bytes, like some proxies and object stores do.
+    """
+
+    def __init__(self, directory: str, honor_range: bool = True, max_range: Optional[int] = None):
+        self.directory = directory
+        self.honor_range = honor_range
+        self.max_range = max_range
+        self.requests: List[Optional[str]] = []
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/{name}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                server.requests.append(self.headers.get("Range"))
+                try:
+                    with open(os.path.join(server.directory, self.path.lstrip("/")), "rb") as file:
+                        data = file.read()
+                except FileNotFoundError:
+                    self.send_error(404)
+                    return
+
+                match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+                if not server.honor_range or not match:
+                    self._send(200, data)
+                    return
+
+                start, end = int(match[1]), min(int(match[2]), len(data) - 1)
+                if server.max_range is not None:
+                    end = min(end, start + server.max_range - 1)
+                if start >= len(data):
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(data)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self._send(206, data[start:end + 1], {"Content-Range": f"bytes {start}-{end}/{len(data)}"})
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                for header, value in (headers or {}).items():
+                    self.send_header(header, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,152 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from RenRestore import RenRestore
+from RenRestore.cli import main, Progress, _profile_label
+from RenRestore.logging import get_logger
+from tests.support import build_rpa3, sample_files
+
+
+class CommandLineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.files = sample_files()
+        self.first = self._archive("first.rpa", dict(list(self.files.items())[:10]))
+        self.second = self._archive("second.rpa", dict(list(self.files.items())[10:]))
+        self.output = os.path.join(self.directory.name, "output")
+
+    def _archive(self, name: str, files, **kwargs) -> str:
+        path = os.path.join(self.directory.name, name)
+        build_rpa3(path, files, **kwargs)
+        return path
+
+    def _run(self, *arguments: str):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            code = main(list(arguments))
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_extract_archives_in_parallel_into_shared_directories(self):
+        code, _, _ = self._run("extract", self.first, self.second, "-o", self.output, "-j", "2")
+
+        self.assertEqual(code, 0)
+        for path, data in self.files.items():
+            with open(os.path.join(self.output, path), "rb") as file:
+                self.assertEqual(file.read(), data)
+
+    def test_extract_with_failed_files_exits_non_zero(self):
+        files = dict(list(self.files.items())[:4])
+        broken = self._archive("broken.rpa", files, overrun=[next(iter(files))])
+
+        code, stdout, _ = self._run("extract", broken, "-o", self.output, "-k")
+
+        self.assertEqual(code, 1)
+        self.assertIn("1 files failed", stdout)
+
+    def test_list_with_filter(self):
+        code, stdout, _ = self._run("list", self.first, "-i", "images/*", "-x", "*file1.bin")
+
+        self.assertEqual(code, 0)
+        listed = [line.split()[1] for line in stdout.splitlines()]
+        expected = [path for path in list(self.files)[:10]
+                    if path.startswith("images") and path != os.path.join("images", "file1.bin")]
+        self.assertEqual(listed, sorted(expected))
+
+    def test_unexpected_errors_are_reported_per_archive(self):
+        original = RenRestore.list_files
+
+        def list_files(restorer, archive, **kwargs):
+            if archive == self.first:
+                raise ValueError("invalid literal for int()")
+            return original(restorer, archive, **kwargs)
+
+        with mock.patch.object(RenRestore, "list_files", list_files), \
+                self.assertLogs(get_logger(), "ERROR") as logs:
+            code, stdout, _ = self._run("list", self.first, self.second)
+
+        self.assertEqual(code, 1)
+        self.assertIn(f"{self.second}:", stdout)
+        self.assertEqual(logs.output, [f"ERROR:RenRestore.logging:{self.first}: ValueError: invalid literal for int()"])
+
+    def test_failed_archive_is_logged_on_one_line(self):
+        broken = self._archive("broken.rpa", self.files, overrun=[next(iter(self.files))])
+
+        with self.assertLogs(get_logger(), "ERROR") as logs:
+            code, _, _ = self._run("verify", broken)
+
+        self.assertEqual(code, 1)
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual(logs.output[0], f"ERROR:RenRestore.logging:{broken}: EOFError: Unexpected end of archive")
+
+    def test_interrupt_skips_queued_archives(self):
+        archives = [self._archive(f"queued{number}.rpa", self.files) for number in range(5)]
+        started = []
+
+        def list_files(restorer, archive, **kwargs):
+            started.append(archive)
+            if archive == self.first:
+                raise KeyboardInterrupt()
+            time.sleep(0.2)
+            return {}
+
+        with mock.patch.object(RenRestore, "list_files", list_files), self.assertLogs(get_logger(), "ERROR"):
+            code, _, _ = self._run("list", self.first, *archives)
+
+        self.assertEqual(code, 130)
+        self.assertLessEqual(len(started), 2)
+
+    def test_list_continues_after_malformed_archive(self):
+        malformed = os.path.join(self.directory.name, "malformed.rpa")
+        with open(malformed, "wb") as file:
+            file.write(b"RPA-3.0 not-hex not-hex\n")
+
+        with self.assertLogs(get_logger(), "ERROR") as logs:
+            code, stdout, _ = self._run("list", malformed, self.first)
+
+        self.assertEqual(code, 1)
+        self.assertIn(f"{self.first}:", stdout)
+        self.assertIn("malformed.rpa", logs.output[0])
+
+    def test_verify(self):
+        code, stdout, _ = self._run("verify", self.first, self.second)
+
+        self.assertEqual(code, 0)
+        self.assertIn("first.rpa: 10 files OK, 0 failed", stdout)
+
+    def test_profile_writes_reports_per_phase(self):
+        profile = os.path.join(self.directory.name, "profile")
+        code, _, _ = self._run("verify", self.first, "--profile", profile)
+
+        self.assertEqual(code, 0)
+        for phase in ("detect", "preprocess", "index", "verify"):
+            self.assertTrue(os.path.exists(os.path.join(profile, f"000-first.rpa.{phase}.prof")))
+            self.assertTrue(os.path.exists(os.path.join(profile, f"000-first.rpa.{phase}.txt")))
+
+
+    def test_profile_label_of_url(self):
+        label = _profile_label(3, "https://bucket.example.com/games/scripts.rpa?X-Signature=a%2Fb&Expires=1")
+        self.assertEqual(label, "003-scripts.rpa")
+        self.assertEqual(_profile_label(0, os.path.join("games", "my game.rpa")), "000-my_game.rpa")
+
+
+class ProgressTest(unittest.TestCase):
+    def test_log_clears_and_redraws_the_line(self):
+        stream = io.StringIO()
+        progress = Progress(stream, interval=0)
+        progress.update("images/file.png", 1024)
+        progress.log("a log record")
+
+        after_update = stream.getvalue().split("a log record\n")
+        self.assertEqual(len(after_update), 2)
+        self.assertTrue(after_update[0].endswith(f"\r{"":<{Progress.width}}\r"))
+        self.assertIn("images/file.png", after_update[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+from typing import BinaryIO
+from unittest import mock
+
+from RenRestore import RenRestore
+from RenRestore.ArchiveFormats import DefaultFormatUtilities
+from RenRestore.ArchiveFormats.Utility import inject_process_in_format
+from RenRestore.errors import FormatError, ErrorExtractingFile
+from tests.support import build_rpa3, sample_files
+
+
+class RestoreTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.files = sample_files()
+        self.archive = os.path.join(self.directory.name, "archive.rpa")
+        build_rpa3(self.archive, self.files)
+        self.output = os.path.join(self.directory.name, "output")
+
+    def _broken_archive(self) -> str:
+        path = os.path.join(self.directory.name, "broken.rpa")
+        build_rpa3(path, self.files, overrun=[os.path.join("images", "file1.bin")])
+        return path
+
+
+class ListFilesTest(RestoreTestCase):
+    def test_lists_sizes(self):
+        listing = RenRestore().list_files(self.archive)
+        self.assertEqual(listing, {path: len(data) for path, data in self.files.items()})
+
+    def test_filter(self):
+        listing = RenRestore().list_files(self.archive, file_filter=lambda path: path.startswith("scripts"))
+        self.assertEqual(set(listing), {path for path in self.files if path.startswith("scripts")})
+
+    def test_malformed_header_is_format_error(self):
+        path = os.path.join(self.directory.name, "malformed.rpa")
+        with open(path, "wb") as file:
+            file.write(b"RPA-3.0 not-hex not-hex\n")
+
+        with self.assertRaises(FormatError):
+            RenRestore().list_files(path)
+
+
+class VerifyFilesTest(RestoreTestCase):
+    def test_verifies_every_file(self):
+        self.assertEqual(RenRestore().verify_files(self.archive), (len(self.files), 0))
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_counts_unreadable_files(self):
+        verified, failed = RenRestore(continue_on_error=True).verify_files(self._broken_archive())
+        self.assertEqual((verified, failed), (len(self.files) - 1, 1))
+
+    def test_raises_without_continue_on_error(self):
+        with self.assertRaises(ErrorExtractingFile):
+            RenRestore().verify_files(self._broken_archive())
+
+
+class ExtractFilesTest(RestoreTestCase):
+    def test_extracts_filtered_files(self):
+        failed = RenRestore(create_output_directory=True).extract_files(
+            self.archive, self.output, file_filter=lambda path: path.startswith("images"))
+
+        self.assertEqual(failed, 0)
+        for path, data in self.files.items():
+            target = os.path.join(self.output, path)
+            self.assertEqual(os.path.exists(target), path.startswith("images"))
+            if path.startswith("images"):
+                with open(target, "rb") as file:
+                    self.assertEqual(file.read(), data)
+
+    def test_counts_failed_files_and_continues(self):
+        broken = os.path.join("images", "file1.bin")
+        failed = RenRestore(create_output_directory=True, continue_on_error=True).extract_files(
+            self._broken_archive(), self.output)
+
+        self.assertEqual(failed, 1)
+        for path in self.files:
+            self.assertEqual(os.path.exists(os.path.join(self.output, path)), path != broken)
+        self.assertFalse(os.path.exists(os.path.join(self.output, f"{broken}.part")))
+
+    def test_memory_is_bounded_by_chunks(self):
+        large = os.path.join(self.directory.name, "large.rpa")
+        data = os.urandom(16 * 1024 * 1024)
+        build_rpa3(large, {"large.bin": data})
+
+        tracemalloc.start()
+        try:
+            RenRestore(create_output_directory=True).extract_files(large, self.output)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(peak, 3 * DefaultFormatUtilities.READ_CHUNK_SIZE)
+        with open(os.path.join(self.output, "large.bin"), "rb") as file:
+            self.assertEqual(file.read(), data)
+
+    def test_postprocess_output_is_written(self):
+        def postprocess(source: BinaryIO) -> BinaryIO:
+            class Reversed(io.BytesIO):
+                def seek(self, offset: int, whence: int = 0) -> int:
+                    position = super().seek(offset, whence)
+                    self.__init__(self.getvalue()[::-1])
+                    return position
+
+            return Reversed()
+
+        rpa3 = next(archive_format for archive_format in RenRestore().formats if archive_format.name == "RPA-3.0")
+        RenRestore(create_output_directory=True).extract_files(
+            self.archive, self.output, format_override=inject_process_in_format(rpa3, postprocess=postprocess))
+
+        for path, data in self.files.items():
+            with open(os.path.join(self.output, path), "rb") as file:
+                self.assertEqual(file.read(), data[::-1])
+
+    def test_existing_directories_are_reused(self):
+        restorer = RenRestore(create_output_directory=True)
+        self.assertEqual(restorer.extract_files(self.archive, self.output), 0)
+        self.assertEqual(restorer.extract_files(self.archive, self.output), 0)
+
+    def test_progress_is_reported_per_chunk(self):
+        progress = []
+        with mock.patch.object(DefaultFormatUtilities, "READ_CHUNK_SIZE", 1024):
+            RenRestore(create_output_directory=True).extract_files(
+                self.archive, self.output, on_progress=lambda path, length: progress.append((path, length)))
+
+        self.assertTrue(all(length <= 1024 for _, length in progress))
+        self.assertEqual(sum(length for _, length in progress), sum(map(len, self.files.values())))
+
+    def test_phase_hook(self):
+        phases = []
+
+        def phase_hook(name: str):
+            phases.append(name)
+            return mock.MagicMock()
+
+        RenRestore(create_output_directory=True).extract_files(self.archive, self.output, phase_hook=phase_hook)
+        self.assertEqual(phases, ["detect", "preprocess", "index", "extract"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+import os
+import tempfile
+import unittest
+
+from RenRestore import RenRestore
+from RenRestore.storage import (
+    StorageBackend,
+    LocalFileStorage,
+    MemoryMappedStorage,
+    HTTPRangeStorage,
+    CachedStorage,
+    StorageReader,
+    open_archive,
+)
+from tests.support import RangeServer, build_rpa3, sample_files
+
+
+class CountingStorage(StorageBackend):
+    def __init__(self, data: bytes):
+        self.name = "memory"
+        self.data = data
+        self.reads = []
+        self.closed = False
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        self.reads.append((offset, length))
+        return self.data[offset:offset + length]
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class StorageTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.data = os.urandom(10_000)
+        self.path = self._write("data.bin", self.data)
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+
+class LocalStorageTest(StorageTestCase):
+    def test_local_file_reads_by_position(self):
+        with LocalFileStorage(self.path) as storage:
+            self.assertEqual(storage.size, len(self.data))
+            self.assertEqual(storage.read_at(100, 50), self.data[100:150])
+            self.assertEqual(storage.read_at(9_990, 50), self.data[9_990:])
+            self.assertEqual(storage.read_at(20_000, 50), b"")
+
+    def test_memory_mapped_reads_by_position(self):
+        with MemoryMappedStorage(self.path) as storage:
+            self.assertEqual(storage.size, len(self.data))
+            self.assertEqual(storage.read_at(100, 50), self.data[100:150])
+            self.assertEqual(storage.read_at(9_990, 50), self.data[9_990:])
+
+    def test_memory_mapped_empty_file(self):
+        with MemoryMappedStorage(self._write("empty.bin", b"")) as storage:
+            self.assertEqual(storage.size, 0)
+            self.assertEqual(storage.read_at(0, 10), b"")
+
+
+class HTTPRangeStorageTest(StorageTestCase):
+    def test_size_and_ranged_reads(self):
+        with RangeServer(self.directory.name) as server:
+            storage = HTTPRangeStorage(server.url("data.bin"))
+            self.assertEqual(storage.size, len(self.data))
+            self.assertEqual(storage.read_at(1_000, 24), self.data[1_000:1_024])
+            self.assertEqual(storage.read_at(9_999, 10), self.data[9_999:])
+            self.assertEqual(server.requests, ["bytes=0-0", "bytes=1000-1023", "bytes=9999-9999"])
+
+    def test_empty_resource_is_size_zero(self):
+        self._write("empty.bin", b"")
+        with RangeServer(self.directory.name) as server:
+            storage = HTTPRangeStorage(server.url("empty.bin"))
+            self.assertEqual(storage.size, 0)
+            self.assertEqual(storage.read_at(0, 10), b"")
+
+    def test_rejects_different_range(self):
+        with RangeServer(self.directory.name, max_range=100) as server:
+            storage = HTTPRangeStorage(server.url("data.bin"))
+            self.assertEqual(storage.read_at(0, 100), self.data[:100])
+            with self.assertRaises(OSError):
+                storage.read_at(0, 500)
+
+    def test_rejects_servers_ignoring_range(self):
+        with RangeServer(self.directory.name, honor_range=False) as server:
+            with self.assertRaises(OSError):
+                _ = HTTPRangeStorage(server.url("data.bin")).size
+
+
+class CachedStorageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.data = os.urandom(1_000)
+        self.backend = CountingStorage(self.data)
+
+    def test_reads_across_block_edges_and_end(self):
+        storage = CachedStorage(self.backend, block_size=64, read_ahead=0)
+        for offset, length in ((0, 1), (60, 10), (63, 130), (900, 500), (999, 1), (1_000, 1)):
+            self.assertEqual(storage.read_at(offset, length), self.data[offset:offset + length])
+
+    def test_missing_run_is_one_backend_read(self):
+        storage = CachedStorage(self.backend, block_size=64, read_ahead=0)
+        storage.read_at(10, 300)
+        self.assertEqual(self.backend.reads, [(0, 320)])
+
+    def test_read_ahead_serves_sequential_reads(self):
+        storage = CachedStorage(self.backend, block_size=64, read_ahead=3)
+        for offset in range(0, 256, 32):
+            self.assertEqual(storage.read_at(offset, 32), self.data[offset:offset + 32])
+        self.assertEqual(len(self.backend.reads), 1)
+        self.assertEqual(storage.hits, 7)
+
+    def test_read_ahead_stops_at_cached_block(self):
+        storage = CachedStorage(self.backend, block_size=64, read_ahead=3)
+        storage.read_at(2 * 64, 1)
+        storage.read_at(0, 1)
+        self.assertEqual(self.backend.reads, [(2 * 64, 4 * 64), (0, 2 * 64)])
+
+    def test_lru_eviction_is_bounded(self):
+        storage = CachedStorage(self.backend, block_size=64, cache_size=3 * 64, read_ahead=0)
+        for block in range(10):
+            storage.read_at(block * 64, 1)
+            self.assertLessEqual(len(storage._blocks), storage.max_blocks)
+        self.assertEqual(storage.max_blocks, 3)
+
+        storage.read_at(7 * 64, 1)
+        storage.read_at(10 * 64, 1)
+        # Block 7 was used most recently before the miss, so block 8 was evicted instead
+        self.assertIn(7, storage._blocks)
+        self.assertNotIn(8, storage._blocks)
+
+
+class StorageReaderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.data = b"RPA-3.0 header line\n" + os.urandom(500)
+        self.backend = CountingStorage(self.data)
+
+    def test_file_interface(self):
+        reader = StorageReader(self.backend)
+        self.assertEqual(reader.readline(), b"RPA-3.0 header line\n")
+        self.assertEqual(reader.read(4), self.data[20:24])
+        reader.seek(-10, os.SEEK_END)
+        self.assertEqual(reader.read(), self.data[-10:])
+        self.assertEqual(reader.read_at(0, 3), b"RPA")
+
+    def test_shared_backend_is_not_closed(self):
+        first = StorageReader(self.backend, owns_backend=False)
+        second = StorageReader(self.backend, owns_backend=False)
+        first.close()
+        self.assertFalse(self.backend.closed)
+        self.assertEqual(second.read(3), b"RPA")
+
+        StorageReader(self.backend).close()
+        self.assertTrue(self.backend.closed)
+
+
+class RemoteExtractionTest(StorageTestCase):
+    def test_extract_from_url_opens_archive_once(self):
+        files = sample_files()
+        build_rpa3(os.path.join(self.directory.name, "archive.rpa"), files)
+        output = os.path.join(self.directory.name, "output")
+
+        with RangeServer(self.directory.name) as server:
+            RenRestore(create_output_directory=True).extract_files(server.url("archive.rpa"), output)
+
+        # One size probe, the header and read-ahead, then the remaining members and the index
+        self.assertEqual(server.requests.count("bytes=0-0"), 1)
+        self.assertLessEqual(len(server.requests), 4)
+        for path, data in files.items():
+            with open(os.path.join(output, path), "rb") as file:
+                self.assertEqual(file.read(), data)
+
+    def test_memory_mapped_archive_is_not_cached(self):
+        with open_archive(self.path, use_mmap=True) as reader:
+            self.assertIsInstance(reader.backend, MemoryMappedStorage)
+            self.assertEqual(reader.read(), self.data)
+
+    def test_open_archive_local(self):
+        files = sample_files()
+        path = os.path.join(self.directory.name, "archive.rpa")
+        build_rpa3(path, files)
+        output = os.path.join(self.directory.name, "output")
+
+        restorer = RenRestore(create_output_directory=True,
+                              archive_opener=lambda location: open_archive(location, use_mmap=True))
+        restorer.extract_files(path, output)
+
+        for name, data in files.items():
+            with open(os.path.join(output, name), "rb") as file:
+                self.assertEqual(file.read(), data)
+
+
+if __name__ == "__main__":
+    unittest.main()